@@ -6,7 +6,8 @@ An image from text generator for Python 3.12 using Pillow
 You can both import this file and text2image.py to use this in your project.
 As well as running this or the other file as a CLI application.
 However, this one specifically implements the CLI part of the app.
-Therefore, by importing this, you'll also import some arg conversion functions.
+Therefore, by importing this, you'll only import some arg conversion functions.
+text2image (and therefore Pillow) is only imported when it's actually needed.
 
 MIT Copyright (c) 2024 Marco4413
 
@@ -18,20 +19,35 @@ https://github.com/Marco4413/Text2Image
 # - pillow (10.4.0)
 # $ pip install pillow
 
-from text2image import *
-
 import argparse as _argparse
+import textwrap as _textwrap
+import re as _re
+
+from functools import lru_cache as _lru_cache
+
+# text2image is imported lazily to avoid loading Pillow when it's not needed
+from typing import TYPE_CHECKING as _TYPE_CHECKING
+if _TYPE_CHECKING:
+    from typing import Optional
+    from text2image import Vec2, RGBColor
+
+_ESCAPE_RE = _re.compile(r"\\([\\n])")
+
+def _replace_escape_seq(m: _re.Match) -> str:
+    seq = m.group(1)
+    return "\n" if seq == "n" else seq
 
+_MEASURE_FORMAT = "<PIXELS | Npx | Npt>"
 def get_measure_format() -> str:
-    return "<PIXELS | Npx | Npt>"
+    return _MEASURE_FORMAT
 
 def any_measure_type(measure: str) -> int:
-    if measure.endswith("px"):
-        val = int(measure[:-2])
-        return px(val)
-    elif measure.endswith("pt"):
-        val = int(measure[:-2])
-        return pt(val)
+    from text2image import px, pt
+    unit = measure[-2:]
+    if unit == "px":
+        return px(int(measure[:-2]))
+    elif unit == "pt":
+        return pt(int(measure[:-2]))
     return int(measure)
 
 def measure_type(measure: str) -> int:
@@ -40,43 +56,61 @@ def measure_type(measure: str) -> int:
         raise ValueError("Measure must be non-negative.")
     return val
 
+_RATIO_FORMAT = "<N | N/D>"
 def get_ratio_format() -> str:
-    return "<N | N/D>"
+    return _RATIO_FORMAT
 
 def ratio_type(ratio_str: str) -> float:
-    ratio_comps = [float(x) for x in ratio_str.split("/")]
-    if len(ratio_comps) == 1:
-        return ratio_comps[0]
-    elif len(ratio_comps) == 2:
-        if ratio_comps[1] == 0.0:
-            raise ValueError("Ratio has division by 0.")
-        return ratio_comps[0]/ratio_comps[1]
-    raise ValueError("Ratio must be either a float or a pair of floats separated by /.")
-
+    (num, sep, den) = ratio_str.partition("/")
+    if not sep:
+        return float(num)
+    elif "/" in den:
+        raise ValueError("Ratio must be either a float or a pair of floats separated by /.")
+    den = float(den)
+    if den == 0.0:
+        raise ValueError("Ratio has division by 0.")
+    return float(num)/den
+
+# TODO: Maybe use measure format? Though it would make the tip WAY longer.
+_VEC2_FORMAT = "<X,Y>"
 def get_vec2_format() -> str:
-    # TODO: Maybe use measure format? Though it would make the tip WAY longer.
-    return "<X,Y>"
+    return _VEC2_FORMAT
 
-def vec2_type(vec2_str: str) -> Vec2:
-    vec2 = tuple(any_measure_type(x) for x in vec2_str.split(","))
-    if len(vec2) != 2:
+def vec2_type(vec2_str: str) -> "Vec2":
+    (x, sep, y) = vec2_str.partition(",")
+    if not sep or "," in y:
         raise ValueError("A Vec2 is a pair of comma-separated measures.")
-    return vec2
+    return (any_measure_type(x), any_measure_type(y))
 
-def positive_vec2_type(vec2_str: str) -> Vec2:
+def positive_vec2_type(vec2_str: str) -> "Vec2":
     # I know that positive is strictly > 0 but this also accepts 0s.
     # The name would have been too long for my likings.
-    vec2 = tuple(measure_type(x) for x in vec2_str.split(","))
-    if len(vec2) != 2:
+    (x, sep, y) = vec2_str.partition(",")
+    if not sep or "," in y:
         raise ValueError("A non-negative Vec2 is a pair of comma-separated positive measures.")
-    return vec2
+    return (measure_type(x), measure_type(y))
 
+_COLOR_FORMAT = "<transparent | R,G,B | 0xL | 0xLL | 0xRGB | 0xRRGGBB>"
 def get_color_format() -> str:
-    return "<transparent | R,G,B | 0xL | 0xLL | 0xRGB | 0xRRGGBB>"
+    return _COLOR_FORMAT
+
+def color_type(color_str: str) -> "Optional[RGBColor]":
+    from text2image import color
+    return color(color_str)
+# argparse uses the name of the type in its error messages ("invalid color value")
+color_type.__name__ = "color"
+
+# Explicit metavars for choices, so that _CustomHelpFormatter does not have to build them
+_ALIGNMENT_FORMAT = "<left | center | right>"
+_BASELINE_FORMAT  = "<none | broad | perfect>"
+_COLORIZE_FORMAT  = "<grayscale+ | grayscale | luminance>"
+_COMPRESS_LEVEL_FORMAT = "<0-9>"
 
 class _CustomHelpFormatter(_argparse.HelpFormatter):
     """Custom HelpFormatter from argparse which fits the needs of t2i's CLI"""
 
+    _DEFAULTING_NARGS = frozenset((_argparse.OPTIONAL, _argparse.ZERO_OR_MORE))
+
     # Copied from the base class and changed choices formatting.
     def _metavar_formatter(self, action, default_metavar):
         if action.metavar is not None:
@@ -97,40 +131,33 @@ class _CustomHelpFormatter(_argparse.HelpFormatter):
     # -fg, --fill-color <transparent | R,G,B | 0xL | 0xLL | 0xRGB | 0xRRGGBB>
     # Which is cleaner when metavars explain the format of the var.
     def _format_action_invocation(self, action: _argparse.Action) -> str:
-        from typing import List
         if not action.option_strings:
             default = self._get_default_metavar_for_positional(action)
             metavar, = self._metavar_formatter(action, default)(1)
             return metavar
+        # if the Optional doesn't take a value, format is:
+        #    -s, --long
+        elif action.nargs == 0:
+            return ", ".join(action.option_strings)
+        # if the Optional takes a value, format is:
+        #    -s, --long ARGS
         else:
-            parts: List[str] = []
-            # if the Optional doesn't take a value, format is:
-            #    -s, --long
-            if action.nargs == 0:
-                parts.extend(action.option_strings)
-            # if the Optional takes a value, format is:
-            #    -s, --long ARGS
-            else:
-                default = self._get_default_metavar_for_optional(action)
-                args_string = self._format_args(action, default)
-                for option_string in action.option_strings:
-                    if option_string.startswith("--"):
-                        parts.append("%s %s" % (option_string, args_string))
-                    else:
-                        parts.append(option_string)
-            return ", ".join(parts)
+            default = self._get_default_metavar_for_optional(action)
+            args_string = self._format_args(action, default)
+            return ", ".join(
+                f"{option_string} {args_string}" if option_string.startswith("--") else option_string
+                for option_string in action.option_strings
+            )
     # Copied from _argparse.ArgumentDefaultsHelpFormatter.
     # This won't emit the default if it's None or a bool.
     def _get_help_string(self, action: _argparse.Action) -> str:
-        import textwrap
-        help = "" if action.help is None else textwrap.dedent(action.help).strip()
+        help = "" if action.help is None else _textwrap.dedent(action.help).strip()
         if (action.default is not _argparse.SUPPRESS
             and action.default is not None
             and not isinstance(action, _argparse._StoreConstAction)
             and "default:" not in help
         ):
-            defaulting_nargs = [_argparse.OPTIONAL, _argparse.ZERO_OR_MORE]
-            if action.option_strings or action.nargs in defaulting_nargs:
+            if action.option_strings or action.nargs in self._DEFAULTING_NARGS:
                 help += "\n(default: %(default)s)"
         return help
     # Based on _argparse.RawDescriptionHelpFormatter
@@ -138,30 +165,34 @@ class _CustomHelpFormatter(_argparse.HelpFormatter):
     def _fill_text(self, text: str, width: int, indent: str) -> str:
         return "\n".join(indent + line.strip() for line in text.splitlines())
     def _split_lines(self, text: str, width: int) -> list:
-        import textwrap
-        def count_indent(text: str) -> int:
-            count = 0
-            for ch in text:
-                if not ch.isspace(): break
-                count += 1
-            return count
         text_lines = []
-        for line in textwrap.dedent(text).strip().splitlines():
-            line_indent = count_indent(line)
-            wrapped_lines = textwrap.wrap(line, width, subsequent_indent=(" " * line_indent))
+        for line in _textwrap.dedent(text).strip().splitlines():
+            line_indent = len(line) - len(line.lstrip())
+            wrapped_lines = _textwrap.wrap(line, width, subsequent_indent=(" " * line_indent))
             text_lines.extend(wrapped_lines)
         text_lines.append("")
         return text_lines
 
-def __main__(argv) -> int:
-    import os, traceback
-    from datetime import datetime
-    from sys import stderr
+def _generate_and_save(text: str, filepath: str, font_family: str, font_size: int, compress_level: int, generate_kwargs: dict) -> None:
+    """Generates the image of a single text and saves it. Must be a top-level function to be used by ProcessPoolExecutor."""
+    from text2image import generate_text_image, load_font
+    font = load_font(font_family, font_size)
+    generate_text_image(text, font=font, **generate_kwargs).save(filepath, format="png", compress_level=compress_level, optimize=False)
+
+_USAGE = "%(prog)s [-h | --help] [option ...] [--] text [text ...]"
+
+@_lru_cache(maxsize=4)
+def _build_parser(program: str) -> _argparse.ArgumentParser:
+    """
+    Builds t2i's ArgumentParser. The result is cached, so it must not be modified.
+    Defaults are already converted so that argparse does not need to call type on them.
+    """
+    import os
+    from text2image import is_libraqm_available, color, px, pt
 
-    program = os.path.basename(argv.pop(0))
     arg_parser = _argparse.ArgumentParser(
         prog=program,
-        usage="%(prog)s [-h | --help] [option ...] [--] text [text ...]",
+        usage=_USAGE,
         description="""
             A Text to Image generator.
 
@@ -185,18 +216,23 @@ def __main__(argv) -> int:
         e.g. 'char_{default_filename}'
         (default: '%(default)s')
     """)
+    arg_parser.add_argument("--png-compress-level", type=int, choices=range(10), metavar=_COMPRESS_LEVEL_FORMAT, default=3, help="""
+        the zlib compression level used to save the images.
+        lower levels are faster to encode but produce bigger files.
+        0 writes uncompressed images
+    """)
 
     font_path = os.path.join(os.path.dirname(__file__), "JetBrainsMono.ttf")
     arg_parser.add_argument("-ff", "--font-family", type=str, metavar="<FONT_FAMILY>", default=font_path, help="the font family to use.\ncan also be a path to a truetype font file\n(default: '%(default)s')")
-    arg_parser.add_argument("-fs", "--font-size", type=measure_type, metavar=get_measure_format(), default="32pt", help="the font size to use")
+    arg_parser.add_argument("-fs", "--font-size", type=measure_type, metavar=_MEASURE_FORMAT, default=pt(32), help="the font size to use\n(default: 32pt)")
     arg_parser.add_argument("--no-ligatures", dest="ligatures", action="store_false", help=f"disable font ligatures. if libraqm is not available, ligatures are disabled by default.\nlibraqm:{'' if is_libraqm_available() else ' not'} available")
-    arg_parser.add_argument("-fg", "--fill-color", type=color, metavar=get_color_format(), default="0xE6E2E1", help="the color to fill the text with")
-    arg_parser.add_argument("-stw", "--stroke-width", type=measure_type, metavar=get_measure_format(), default="0px", help="the width of the stroke used to draw the text")
-    arg_parser.add_argument("-st", "--stroke-color", type=color, metavar=get_color_format(), default="transparent", help="the color of the stroke used to draw the text")
-    arg_parser.add_argument("-align", "--multiline-align", choices=("left","center","right"), default="center", help="the alignment used for multiline text")
-    arg_parser.add_argument("-spacing", "--multiline-spacing", type=any_measure_type, metavar=get_measure_format(), default="4px", help="the spacing between lines in multiline text.\nmay be a negative value")
+    arg_parser.add_argument("-fg", "--fill-color", type=color_type, metavar=_COLOR_FORMAT, default=color("0xE6E2E1"), help="the color to fill the text with\n(default: 0xE6E2E1)")
+    arg_parser.add_argument("-stw", "--stroke-width", type=measure_type, metavar=_MEASURE_FORMAT, default=px(0), help="the width of the stroke used to draw the text\n(default: 0px)")
+    arg_parser.add_argument("-st", "--stroke-color", type=color_type, metavar=_COLOR_FORMAT, default=None, help="the color of the stroke used to draw the text\n(default: transparent)")
+    arg_parser.add_argument("-align", "--multiline-align", choices=("left","center","right"), metavar=_ALIGNMENT_FORMAT, default="center", help="the alignment used for multiline text")
+    arg_parser.add_argument("-spacing", "--multiline-spacing", type=any_measure_type, metavar=_MEASURE_FORMAT, default=px(4), help="the spacing between lines in multiline text.\nmay be a negative value\n(default: 4px)")
 
-    arg_parser.add_argument("-baseline", "--baseline-align", choices=("none","broad","perfect"), default="none", help="""
+    arg_parser.add_argument("-baseline", "--baseline-align", choices=("none","broad","perfect"), metavar=_BASELINE_FORMAT, default="none", help="""
         * DOES NOTHING FOR MULTI-LINE TEXT
         * THIS SETTING MUST BE USED WITH THE min-size SETTING
         the kind of alignment used to center the text based on its baseline.
@@ -205,10 +241,10 @@ def __main__(argv) -> int:
             perfect - the baseline of the text is at the center of the image
         the position of the text is ultimately clamped to stay within the image, make sure to have enough space to fit the text
     """)
-    arg_parser.add_argument("-bg", "--background-color", type=color, metavar=get_color_format(), default="transparent", help="the color used as the background of the image")
-    arg_parser.add_argument("-sh", "--shadow-color", type=color, metavar=get_color_format(), default="transparent", help="the color used for text shadows")
+    arg_parser.add_argument("-bg", "--background-color", type=color_type, metavar=_COLOR_FORMAT, default=None, help="the color used as the background of the image\n(default: transparent)")
+    arg_parser.add_argument("-sh", "--shadow-color", type=color_type, metavar=_COLOR_FORMAT, default=None, help="the color used for text shadows\n(default: transparent)")
     arg_parser.add_argument("--no-shadow-blend", dest="shadow_color_blend", action="store_false", help="disables blending the shadow color with the text color")
-    arg_parser.add_argument("--shadow-blend-method", dest="shadow_color_blend_method", choices=("grayscale+","grayscale","luminance"), default="grayscale+", help="""
+    arg_parser.add_argument("--shadow-blend-method", dest="shadow_color_blend_method", choices=("grayscale+","grayscale","luminance"), metavar=_COLORIZE_FORMAT, default="grayscale+", help="""
         * DOES NOTHING IF no-shadow-blend IS SPECIFIED
         the method to use for blending the shadow color with the text color.
             grayscale+ - blends with a brighter grayscale of the text
@@ -216,86 +252,135 @@ def __main__(argv) -> int:
             luminance  - blends with the luminance of the text
         blending is currently done on a pixel basis and not with some average of the whole text
     """)
-    arg_parser.add_argument("-sho", "--shadow-offset", type=vec2_type, metavar=get_vec2_format(), default="0,0", help="the offset of the text shadow")
+    arg_parser.add_argument("-sho", "--shadow-offset", type=vec2_type, metavar=_VEC2_FORMAT, default=(0,0), help="the offset of the text shadow\n(default: 0,0)")
     arg_parser.add_argument("-shb", "--shadow-blur", type=float, metavar="<SHADOW_BLUR>", default=0.0, help="the intensity of the blur applied to the text shadow.\nnone if <= 0")
 
-    arg_parser.add_argument("-padx", "--padding-x", dest="padx", type=positive_vec2_type, metavar="<L,R>", default="0,0", help="the horizontal padding applied to the left and right of the text")
-    arg_parser.add_argument("-pady", "--padding-y", dest="pady", type=positive_vec2_type, metavar="<T,B>", default="0,0", help="the vertical padding applied to the top and bottom of the text")
-    arg_parser.add_argument("-pad", "--padding", type=positive_vec2_type, metavar=get_vec2_format(), default=None, help="this setting overrides padx and pady.\nsets both horizontal and vertical padding")
-    arg_parser.add_argument("-aspect", "--aspect-ratio", type=ratio_type, metavar=get_ratio_format(), help="the desired aspect ratio of the output image.\nfit to text if <= 0 or not specified.\ncalculated from min-size if provided and this setting is not")
-    arg_parser.add_argument("-size", "--min-size", type=positive_vec2_type, metavar=get_vec2_format(), help="the minimum size of the image.\nif the text does not fit, the image is expanded")
+    arg_parser.add_argument("-padx", "--padding-x", dest="padx", type=positive_vec2_type, metavar="<L,R>", default=(0,0), help="the horizontal padding applied to the left and right of the text\n(default: 0,0)")
+    arg_parser.add_argument("-pady", "--padding-y", dest="pady", type=positive_vec2_type, metavar="<T,B>", default=(0,0), help="the vertical padding applied to the top and bottom of the text\n(default: 0,0)")
+    arg_parser.add_argument("-pad", "--padding", type=positive_vec2_type, metavar=_VEC2_FORMAT, default=None, help="this setting overrides padx and pady.\nsets both horizontal and vertical padding")
+    arg_parser.add_argument("-aspect", "--aspect-ratio", type=ratio_type, metavar=_RATIO_FORMAT, help="the desired aspect ratio of the output image.\nfit to text if <= 0 or not specified.\ncalculated from min-size if provided and this setting is not")
+    arg_parser.add_argument("-size", "--min-size", type=positive_vec2_type, metavar=_VEC2_FORMAT, help="the minimum size of the image.\nif the text does not fit, the image is expanded")
+    return arg_parser
 
+def __main__(argv) -> int:
+    import os, traceback
+    from datetime import datetime
+    from sys import stderr
+
+    # argv is not modified, since it may be passed from other scripts through cli
+    program = os.path.basename(argv[0])
+    argv = argv[1:]
+    # Printing the usage does not require Pillow, so we don't import it
     if len(argv) == 0:
-        arg_parser.print_usage()
+        print("usage: " + (_USAGE % { "prog": program }))
         return 0
+
+    from text2image import sanitize_filename, load_font
+
+    arg_parser = _build_parser(program)
     opt = arg_parser.parse_args(argv)
 
-    if opt.out_directory is not None:
-        if not os.path.exists(opt.out_directory):
-            try:
-                os.makedirs(opt.out_directory, exist_ok=True)
-            except:
-                print(f"ERROR: Could not generate output directory '{opt.out_directory}'.", file=stderr);
-                return 1
+    try:
+        os.makedirs(opt.out_directory, exist_ok=True)
+    except OSError:
+        print(f"ERROR: Could not generate output directory '{opt.out_directory}'.", file=stderr);
+        return 1
 
-    font = None
     try:
-        font = ImageFont.truetype(opt.font_family, opt.font_size)
+        load_font(opt.font_family, opt.font_size)
     except OSError:
         print(f"ERROR: Could not load font '{opt.font_family}'.", file=stderr)
         return 1
 
+    # Font is not included since it's loaded by _generate_and_save
+    generate_kwargs = {
+        "ligatures": opt.ligatures,
+        "fill_color": opt.fill_color,
+        "stroke_width": opt.stroke_width,
+        "stroke_color": opt.stroke_color,
+        "multiline_align": opt.multiline_align,
+        "multiline_spacing": opt.multiline_spacing,
+        "baseline_align": opt.baseline_align,
+        "background_color": opt.background_color,
+        "shadow_color": opt.shadow_color,
+        "shadow_color_blend": opt.shadow_color_blend,
+        "shadow_color_blend_method": opt.shadow_color_blend_method,
+        "shadow_offset": opt.shadow_offset,
+        "shadow_blur": opt.shadow_blur,
+        "padx": opt.padx,
+        "pady": opt.pady,
+        "padding": opt.padding,
+        "aspect_ratio": opt.aspect_ratio,
+        "min_size": opt.min_size,
+    }
+
     today = datetime.today()
-    for idx in range(len(opt.text)):
-        text = opt.text[idx]
-        def replace_escape_seq(m: re.Match) -> str:
-            seq = m.group(1)
-            if seq == "n": return "\n"
-            return seq
-        text = re.sub(r"\\([\\n])", replace_escape_seq, text)
-
-        assert opt.out_filename is not None
-        filename = opt.out_filename.format(
-            idx=idx, default_filename=sanitize_filename(text).strip("."),
-            year=today.year, month=today.month, day=today.day,
-            hour=today.hour, minute=today.minute, second=today.second,
-        )
+    # Only idx and default_filename change between texts
+    filename_vars = {
+        "idx": 0, "default_filename": "",
+        "year": today.year, "month": today.month, "day": today.day,
+        "hour": today.hour, "minute": today.minute, "second": today.second,
+    }
+    # Joining with an empty string appends a separator only if needed
+    out_prefix = os.path.join(opt.out_directory, "")
+    filename_template = opt.out_filename
+    assert filename_template is not None
+    # default_filename is only computed if the template uses it
+    from string import Formatter
+    uses_default_filename = any(
+        field is not None and field.partition(".")[0].partition("[")[0] == "default_filename"
+        for (_, field, _, _) in Formatter().parse(filename_template)
+    )
+    jobs = []
+    for (idx, text) in enumerate(opt.text):
+        # Most texts don't contain escape sequences
+        if "\\" in text:
+            text = _ESCAPE_RE.sub(_replace_escape_seq, text)
+
+        filename_vars["idx"] = idx
+        if uses_default_filename:
+            filename_vars["default_filename"] = sanitize_filename(text).strip(".")
+        filename = filename_template.format_map(filename_vars)
 
         if not filename.endswith(".png"):
             filename += ".png"
-        filepath = os.path.join(opt.out_directory, filename)
-        print(f"Generating '{filepath}'...")
-
-        try:
-            generate_text_image(
-                text,
-                font=font,
-                ligatures=opt.ligatures,
-                fill_color=opt.fill_color,
-                stroke_width=opt.stroke_width,
-                stroke_color=opt.stroke_color,
-                multiline_align=opt.multiline_align,
-                multiline_spacing=opt.multiline_spacing,
-                baseline_align=opt.baseline_align,
-                background_color=opt.background_color,
-                shadow_color=opt.shadow_color,
-                shadow_color_blend=opt.shadow_color_blend,
-                shadow_color_blend_method=opt.shadow_color_blend_method,
-                shadow_offset=opt.shadow_offset,
-                shadow_blur=opt.shadow_blur,
-                padx=opt.padx,
-                pady=opt.pady,
-                padding=opt.padding,
-                aspect_ratio=opt.aspect_ratio,
-                min_size=opt.min_size,
-            ).save(filepath, format="png")
-        except:
-            print(f"ERROR: Could not generate '{filepath}'.", file=stderr)
-            traceback.print_exc(file=stderr)
-            return 1
+        filepath = out_prefix + filename
+        jobs.append((text, filepath))
+
+    # Containers may limit the CPUs this process can run on to less than os.cpu_count()
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    workers = min(cpu_count, len(jobs))
+    if workers <= 1:
+        # A process pool with a single worker is only overhead
+        for (text, filepath) in jobs:
+            print(f"Generating '{filepath}'...")
+            try:
+                _generate_and_save(text, filepath, opt.font_family, opt.font_size, opt.png_compress_level, generate_kwargs)
+            except:
+                print(f"ERROR: Could not generate '{filepath}'.", file=stderr)
+                traceback.print_exc(file=stderr)
+                return 1
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for (text, filepath) in jobs:
+                print(f"Generating '{filepath}'...")
+                futures.append(executor.submit(_generate_and_save, text, filepath, opt.font_family, opt.font_size, opt.png_compress_level, generate_kwargs))
+            for (future, (_, filepath)) in zip(futures, jobs):
+                try:
+                    future.result()
+                except:
+                    print(f"ERROR: Could not generate '{filepath}'.", file=stderr)
+                    traceback.print_exc(file=stderr)
+                    for f in futures: f.cancel()
+                    return 1
     print(f"Generated all {len(opt.text)} files.")
     return 0
 
+# Public name for the CLI entry point, for scripts which want to run it
+cli = __main__
+
 if __name__ == "__main__":
     from sys import argv, exit
     exit(__main__(argv.copy()))
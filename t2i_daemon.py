@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+"""
+A persistent server for t2i's CLI
+
+Starting Python and importing Pillow can take longer than generating a few images.
+This script can start a server which keeps t2i loaded (along with its cached parser and fonts)
+and runs t2i's CLI for every request it receives through a Unix socket.
+
+When not started with --serve, this script behaves exactly like t2i.py:
+if a server is listening the arguments are forwarded to it, otherwise they're handled in-process.
+
+MIT Copyright (c) 2024 Marco4413
+
+https://github.com/Marco4413/Text2Image
+"""
+
+# Requires:
+# - Python (3.12)
+# - pillow (10.4.0)
+# - A platform which supports Unix sockets
+# $ pip install pillow
+
+import os, stat, socket, json, traceback
+from typing import Optional
+
+def get_default_socket_path() -> str:
+    """Returns the path of the socket used when T2I_SOCKET is not set."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "t2i.sock")
+    from tempfile import gettempdir
+    return os.path.join(gettempdir(), f"t2i-{os.getuid()}.sock")
+
+def get_socket_path() -> str:
+    return os.environ.get("T2I_SOCKET") or get_default_socket_path()
+
+def _recv_all(conn: socket.socket) -> bytes:
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk: break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def _parse_request(data: bytes) -> Optional[dict]:
+    """Decodes a request sent by send_request. Returns None if it's malformed."""
+    try:
+        request = json.loads(data)
+    except ValueError:
+        return None
+    if (not isinstance(request, dict)
+        or not isinstance(request.get("cwd"), str)
+        or not isinstance(request.get("argv"), list)
+        or not all(isinstance(arg, str) for arg in request["argv"])
+    ):
+        return None
+    return request
+
+def _run_request(request: dict) -> dict:
+    """Runs t2i's CLI with the argv and cwd of the request, capturing its output."""
+    import io
+    from contextlib import redirect_stdout, redirect_stderr
+    from t2i import __main__ as t2i_main
+
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(request["cwd"])
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                code = t2i_main(list(request["argv"]))
+            except SystemExit as e:
+                # argparse exits on errors and --help
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                # A bad request (e.g. an invalid -outfile template) must not stop the server
+                stderr.write(traceback.format_exc())
+                code = 1
+    except OSError as e:
+        print(f"ERROR: {e}", file=stderr)
+        code = 1
+    finally:
+        os.chdir(old_cwd)
+    return { "stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "code": code }
+
+def serve(socket_path: str) -> int:
+    """Serves requests one at a time until interrupted."""
+    import t2i, text2image # Prewarm imports
+
+    from sys import stderr
+    try:
+        socket_stat = os.lstat(socket_path)
+    except FileNotFoundError:
+        socket_stat = None
+    if socket_stat is not None:
+        # Only a socket left behind by a server which is not running anymore can be removed
+        if not stat.S_ISSOCK(socket_stat.st_mode):
+            print(f"ERROR: '{socket_path}' already exists and is not a socket.", file=stderr)
+            return 1
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except ConnectionRefusedError:
+                os.remove(socket_path)
+            except OSError as e:
+                print(f"ERROR: Could not check whether '{socket_path}' is in use: {e}", file=stderr)
+                return 1
+            else:
+                print(f"ERROR: A server is already listening on '{socket_path}'.", file=stderr)
+                return 1
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        # The socket must never be reachable by other users, even for a moment,
+        #  since requests can write files anywhere the server can
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(socket_path)
+        finally:
+            os.umask(old_umask)
+        server.listen()
+        print(f"Listening on '{socket_path}'...")
+        try:
+            while True:
+                (conn, _) = server.accept()
+                with conn:
+                    try:
+                        data = _recv_all(conn)
+                    except OSError:
+                        # The client went away before sending its request
+                        continue
+                    request = _parse_request(data)
+                    if request is None:
+                        response = { "stdout": "", "stderr": "ERROR: Malformed request.\n", "code": 1 }
+                    else:
+                        response = _run_request(request)
+                    try:
+                        conn.sendall(json.dumps(response).encode())
+                    except OSError:
+                        # The client went away, there's no one to report to
+                        pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+    return 0
+
+def _is_own_socket(path: str) -> bool:
+    """Returns whether path is a socket owned by the current user."""
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(path_stat.st_mode) and path_stat.st_uid == os.getuid()
+
+def send_request(socket_path: str, argv: list) -> int:
+    """
+    Sends argv to the server listening on socket_path and prints its output.
+
+    :raises FileNotFoundError: If there's no socket at socket_path.
+    :raises ConnectionRefusedError: If no server is listening on socket_path.
+    :raises OSError: If the connection is lost after the request was sent. The server may have run it.
+    :raises ValueError: If the response of the server is malformed.
+    """
+    from sys import stdout, stderr
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps({ "argv": argv, "cwd": os.getcwd() }).encode())
+        client.shutdown(socket.SHUT_WR)
+        response = json.loads(_recv_all(client))
+    stdout.write(response["stdout"])
+    stderr.write(response["stderr"])
+    return response["code"]
+
+def __main__(argv) -> int:
+    if len(argv) > 1 and argv[1] == "--serve":
+        return serve(get_socket_path())
+
+    socket_path = get_socket_path()
+    # Another user may have created the socket (e.g. in the shared temp directory) to receive our requests
+    if _is_own_socket(socket_path):
+        try:
+            return send_request(socket_path, argv)
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            # The server may have already generated the images, so they're not generated again
+            from sys import stderr
+            print(f"ERROR: Lost connection to the server: {e}", file=stderr)
+            return 1
+
+    # No server is running, fallback to in-process generation
+    from t2i import __main__ as t2i_main
+    return t2i_main(argv)
+
+if __name__ == "__main__":
+    from sys import argv, exit
+    exit(__main__(argv.copy()))
@@ -20,29 +20,43 @@ https://github.com/Marco4413/Text2Image
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 
 import re, os.path as os_path
+from functools import lru_cache as _lru_cache
 
 # Try to keep backwards compatibility with Python 3.8
-from typing import Tuple, Optional, Literal
+from typing import Tuple, Optional, Literal, Iterable
 Vec2      = Tuple[int,int]
 RGBColor  = Tuple[int,int,int]
 Alignment = Literal["left","center","right"]
 BaselineAlignment = Literal["none","broad","perfect"]
 ColorizeMethod    = Literal["grayscale+","grayscale","luminance"]
 
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r"[^a-zA-Z0-9\. \-]")
+
+def _replace_unsafe_filename_char(m: re.Match) -> str:
+    ch = m.group(0)
+    if ch.isspace():
+        return " "
+    elif ord(ch) >= 128:
+        return f"U-{ord(ch)}-"
+    return ""
+
 def sanitize_filename(filename: str) -> str:
     """Replaces all path-unsafe characters from filename with safe ones."""
-    def replace_with_codepoint(m: re.Match):
-        ch = m.group(0)
-        if ch.isspace():
-            return " "
-        elif ord(ch) >= 128:
-            return f"U-{ord(ch)}-"
-        return ""
-    return re.sub(r"[^a-zA-Z0-9\. \-]", replace_with_codepoint, filename)
+    return _UNSAFE_FILENAME_CHARS_RE.sub(_replace_unsafe_filename_char, filename)
 
 def px(x): return x
 def pt(x): return int(x * (96.0/72.0))
 
+# Expand hex colors to the RRGGBB format so that they can be parsed by bytes.fromhex
+_HEX_COLOR_EXPANDERS = {
+    1: lambda l: l*6,
+    2: lambda ll: ll*3,
+    3: lambda rgb: rgb[0]*2 + rgb[1]*2 + rgb[2]*2,
+    6: lambda rrggbb: rrggbb,
+}
+
+_RGB_COLOR_RE = re.compile(r"\A(\d{1,3}),(\d{1,3}),(\d{1,3})\Z")
+
 def color(color_str: str) -> Optional[RGBColor]:
     """
     Converts a string into an RGB color.
@@ -56,62 +70,119 @@ def color(color_str: str) -> Optional[RGBColor]:
     if color_str == "transparent":
         return None
 
-    if color_str.startswith("#") or color_str.startswith("0x"):
-        hex_str = color_str[1:] if color_str.startswith("#") else color_str[2:]
-        if len(hex_str) == 1:
-            l = int(hex_str, base=16)
-            return (l * 0x11, l * 0x11, l * 0x11)
-        elif len(hex_str) == 2:
-            ll = int(hex_str, base=16)
-            return (ll, ll, ll)
-        elif len(hex_str) == 3:
-            rgb = int(hex_str, base=16)
-            return (
-                ((rgb & 0xF00) >> 8) * 0x11,
-                ((rgb & 0x0F0) >> 4) * 0x11,
-                ((rgb & 0x00F) >> 0) * 0x11,
-            )
-        elif len(hex_str) == 6:
-            rrggbb = int(hex_str, base=16)
-            return (
-                (rrggbb & 0xFF0000) >> 16,
-                (rrggbb & 0x00FF00) >>  8,
-                (rrggbb & 0x0000FF) >>  0,
-            )
-        raise ValueError("An hex color must have either 1, 2, 3 or 6 digits.")
-
-    rgb_color = tuple(int(x) for x in color_str.split(","))
-    if len(rgb_color) != 3:
+    hex_str = None
+    if color_str[:1] == "#":
+        hex_str = color_str[1:]
+    elif color_str[:2] == "0x":
+        hex_str = color_str[2:]
+
+    if hex_str is not None:
+        expand_hex = _HEX_COLOR_EXPANDERS.get(len(hex_str))
+        if expand_hex is None:
+            raise ValueError("An hex color must have either 1, 2, 3 or 6 digits.")
+        hex_str = expand_hex(hex_str)
+        rgb = bytes.fromhex(hex_str)
+        # bytes.fromhex skips whitespace
+        if len(rgb) != 3:
+            raise ValueError(f"Invalid hex color '{color_str}'.")
+        return (rgb[0], rgb[1], rgb[2])
+
+    # The regex also makes sure that all values are positive
+    m = _RGB_COLOR_RE.match(color_str)
+    if m is None:
+        raise ValueError("A color is a triple of comma-separated positive integers RGB values in the range of [0,255].")
+    rgb_color = (int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    if max(rgb_color) > 255:
         raise ValueError("A color is a triple of comma-separated positive integers RGB values in the range of [0,255].")
-    for comp in rgb_color:
-        if comp < 0 or comp > 255:
-            raise ValueError("A color is a triple of comma-separated positive integers RGB values in the range of [0,255].")
     return rgb_color
 
-def colorize_image(image: Image.Image, color: RGBColor, *, method: ColorizeMethod="grayscale+") -> Image.Image:
-    """Sets every pixel of the given image to color*average_pixel_color"""
+@_lru_cache(maxsize=None)
+def _get_numpy():
+    """numpy is an optional dependency. Returns the numpy module if it's installed, None otherwise."""
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+def _get_color_factor_function(method: ColorizeMethod):
+    """
+    Returns a tuple containing get_color_factor(r, g, b) for the given colorize method
+    and the weights of r, g, b within get_color_factor.
+    """
     # get_color_factor must return a positive value. the closer to the range [0,1] the better
     if method == "grayscale+":
         def get_color_factor(r, g, b): return (r+g+b)/255.0
+        color_weights = (1.0/255.0, 1.0/255.0, 1.0/255.0)
     elif method == "grayscale":
         def get_color_factor(r, g, b): return (r+g+b)/(255.0*3.0)
+        color_weights = (1.0/(255.0*3.0), 1.0/(255.0*3.0), 1.0/(255.0*3.0))
     elif method == "luminance":
         # https://en.wikipedia.org/wiki/Relative_luminance
         def get_color_factor(r, g, b): return (0.2126*r + 0.7152*g + 0.0722*b)/255.0
+        color_weights = (0.2126/255.0, 0.7152/255.0, 0.0722/255.0)
     else:
         raise ValueError("colorize_image method must be one of 'grayscale+', 'grayscale', 'luminance'.")
-    image_pixels = image.load()
-    for i in range(image.size[0]):
-        for j in range(image.size[1]):
-            pixel = image_pixels[i,j]
-            color_factor = get_color_factor(pixel[0], pixel[1], pixel[2])
-            image_pixels[i,j] = (
-                min(int(color[0]*color_factor), 255),
-                min(int(color[1]*color_factor), 255),
-                min(int(color[2]*color_factor), 255),
-                pixel[3]
-            )
-    return image
+    return (get_color_factor, color_weights)
+
+def colorize_color(color: RGBColor, pixel_color: RGBColor, *, method: ColorizeMethod="grayscale+") -> RGBColor:
+    """Returns the color colorize_image would set a pixel of color pixel_color to."""
+    (get_color_factor, _) = _get_color_factor_function(method)
+    color_factor = get_color_factor(pixel_color[0], pixel_color[1], pixel_color[2])
+    return (
+        min(int(color[0]*color_factor), 255),
+        min(int(color[1]*color_factor), 255),
+        min(int(color[2]*color_factor), 255),
+    )
+
+def colorize_image(image: Image.Image, color: RGBColor, *, method: ColorizeMethod="grayscale+") -> Image.Image:
+    """
+    Returns a copy of the given RGBA image where every pixel is set to color*average_pixel_color.
+    The given image is not modified. The work is vectorized with numpy if it's installed, otherwise it's done by Pillow.
+    """
+    (get_color_factor, color_weights) = _get_color_factor_function(method)
+    numpy = _get_numpy()
+    if numpy is not None:
+        # get_color_factor works the same with numpy arrays.
+        # Only r is converted to float, g and b are promoted by numpy when added to it.
+        pixels = numpy.asarray(image)
+        color_factor = get_color_factor(pixels[...,0].astype(numpy.float64), pixels[...,1], pixels[...,2])
+        colorized = numpy.empty_like(pixels)
+        # The same float buffer is reused to compute each channel
+        channel = numpy.empty_like(color_factor)
+        for i in range(3):
+            numpy.multiply(color_factor, color[i], out=channel)
+            numpy.minimum(channel, 255, out=channel)
+            colorized[...,i] = channel
+        colorized[...,3] = pixels[...,3]
+        return Image.fromarray(colorized)
+
+    # Without numpy, a matrix conversion does the same thing within Pillow.
+    # Pillow rounds the result, so 0.5 is subtracted to truncate like int() does.
+    # Since Pillow works with single precision floats, a few pixels may be off by one.
+    (wr, wg, wb) = color_weights
+    matrix = (
+        color[0]*wr, color[0]*wg, color[0]*wb, -0.5,
+        color[1]*wr, color[1]*wg, color[1]*wb, -0.5,
+        color[2]*wr, color[2]*wg, color[2]*wb, -0.5,
+    )
+    colorized = image.convert("RGB").convert("RGB", matrix)
+    colorized.putalpha(image.getchannel("A"))
+    return colorized
+
+@_lru_cache(maxsize=32)
+def load_font(font: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    Loads a truetype font with ImageFont.truetype.
+    Results are cached, so loading the same font and size again returns the same object.
+
+    :param str font: The font family or path to a truetype font file.
+    :param int size: The font size in pixels.
+
+    :return: The loaded font.
+    :rtype: ImageFont.FreeTypeFont
+    """
+    return ImageFont.truetype(font, size)
 
 def is_libraqm_available() -> bool:
     from PIL import features
@@ -121,6 +192,9 @@ def get_opentype_ligature_features() -> tuple:
     # https://learn.microsoft.com/en-us/typography/opentype/spec/featurelist
     return ("calt","clig","dlig","hlig","liga","rlig",)
 
+# Only used to measure text, its size does not matter
+_BBOX_PROBE_DRAW = ImageDraw.Draw(Image.new("RGBA", (0,0), (0,0,0,0)))
+
 def new_image_from_text(
     text: str, *,
     # text settings
@@ -166,9 +240,7 @@ def new_image_from_text(
             font_features = tuple(f"-{x}" for x in font_features)
 
     # get bbox for text
-    image = Image.new("RGBA", (0,0), (0,0,0,0))
-    draw = ImageDraw.Draw(image)
-    (left, top, right, bottom) = draw.multiline_textbbox(
+    (left, top, right, bottom) = _BBOX_PROBE_DRAW.multiline_textbbox(
         (0,0), text,
         align=multiline_align,
         anchor="ms",
@@ -184,8 +256,8 @@ def new_image_from_text(
     width = int(right-left)
     height = int(bottom-top)
 
-    # resize image to fit text
-    image = image.resize((width, height))
+    # create an image which fits the text
+    image = Image.new("RGBA", (width, height), (0,0,0,0))
     draw = ImageDraw.Draw(image)
     draw.multiline_text(
         (x,y), text,
@@ -284,8 +356,25 @@ def generate_text_image(
     shadow = None
     if shadow_color is not None:
         # Can't check for shadow_offset != (0,0) because the shadow may be blurred
-        if shadow_color_blend:
-            shadow = colorize_image(text_image.copy(), shadow_color, method=shadow_color_blend_method)
+        # Pixels of text drawn with a single color are either fully transparent or of that color.
+        # A transparent fill over a stroke leaves blended pixels, so it doesn't count.
+        is_single_color = fill_color is not None and (
+            stroke_width == 0 or stroke_color is None or tuple(stroke_color) == tuple(fill_color))
+        # If set, the shadow is a single color with the alpha of the text
+        shadow_fill = None
+        if shadow_color_blend and is_single_color:
+            assert fill_color is not None
+            shadow_fill = colorize_color(shadow_color, fill_color, method=shadow_color_blend_method)
+        elif not shadow_color_blend and fill_color is not None and (stroke_width == 0 or stroke_color is not None):
+            # The text redrawn in shadow_color covers the same pixels as the text with a solid fill and stroke.
+            # A transparent stroke with a width would be drawn by the shadow, so the text is redrawn for it.
+            shadow_fill = shadow_color
+
+        if shadow_fill is not None:
+            shadow = Image.new("RGBA", text_image.size, (*shadow_fill, 0))
+            shadow.putalpha(text_image.getchannel("A"))
+        elif shadow_color_blend:
+            shadow = colorize_image(text_image, shadow_color, method=shadow_color_blend_method)
         else:
             (shadow, _) = new_image_from_text(
                 text,
@@ -300,10 +389,27 @@ def generate_text_image(
         # Set shadow_offset to 0 so we can safely use it when no shadow is present
         shadow_offset = (0,0)
 
+    if shadow is not None and tuple(shadow_offset) == (0,0) and shadow_blur <= 0.0:
+        # The shadow is right below the text, so they can be merged
+        #  to composite only one image onto the output image
+        shadow.alpha_composite(text_image)
+        text_image = shadow
+        shadow = None
+
     if padding is not None:
         padx = (padding[0], padding[0])
         pady = (padding[1], padding[1])
 
+    # Shortcut for when the image is just the text.
+    # A merged shadow may leave color in fully transparent pixels, so it still goes through compositing
+    if (shadow_color is None and background_color is None
+        and tuple(padx) == (0,0) and tuple(pady) == (0,0)
+        and min_size is None
+        and (aspect_ratio is None or aspect_ratio <= 0.0)
+        and baseline_align == "none"
+    ):
+        return text_image
+
     x = padx[0]
     y = pady[0]
     width = text_image.width + padx[0]+padx[1]
@@ -383,16 +489,61 @@ def generate_text_image(
         full_background_color = (*background_color, 255)
 
     image = Image.new("RGBA", (width, height), full_background_color)
-    draw = ImageDraw.Draw(image)
-    
+
     if shadow is not None:
-        image.alpha_composite(shadow, (x+shadow_offset[0],y+shadow_offset[1]))
+        shadow_x = x+shadow_offset[0]
+        shadow_y = y+shadow_offset[1]
         if shadow_blur > 0.0:
-            image = image.filter(ImageFilter.BoxBlur(shadow_blur))
+            # Only the shadow is blurred, it's expanded beforehand so that the blur is not cut off.
+            # The expanded shadow is clipped to the image, so that the blur extends the edges of the image
+            #  like it does when the whole image is blurred
+            blur_margin = int(shadow_blur)+1
+            blur_left = max(shadow_x-blur_margin, 0)
+            blur_top = max(shadow_y-blur_margin, 0)
+            blur_right = min(shadow_x+shadow.width+blur_margin, width)
+            blur_bottom = min(shadow_y+shadow.height+blur_margin, height)
+            blurred_shadow = Image.new("RGBA", (blur_right-blur_left, blur_bottom-blur_top), (0,0,0,0))
+            # Like the image, fully transparent pixels must be (0,0,0,0) since they're blurred too
+            blur_shadow_x = shadow_x-blur_left
+            blur_shadow_y = shadow_y-blur_top
+            blurred_shadow.alpha_composite(
+                shadow,
+                (max(blur_shadow_x, 0), max(blur_shadow_y, 0)),
+                (max(-blur_shadow_x, 0), max(-blur_shadow_y, 0)),
+            )
+            if background_color is None:
+                # The image is just the shadow here, so the blurred shadow is exactly that part of the blurred image
+                image.paste(blurred_shadow.filter(ImageFilter.BoxBlur(shadow_blur)), (blur_left, blur_top))
+            else:
+                # With a background, blurring the image blurs the shadow after it's composited onto the background.
+                # Blurring with premultiplied alpha gets the same result without the background.
+                blurred_shadow = blurred_shadow.convert("RGBa").filter(ImageFilter.BoxBlur(shadow_blur)).convert("RGBA")
+                image.alpha_composite(blurred_shadow, (blur_left, blur_top))
+        else:
+            # alpha_composite does not accept negative coordinates, the part of the shadow outside the image is skipped
+            image.alpha_composite(
+                shadow,
+                (max(shadow_x, 0), max(shadow_y, 0)),
+                (max(-shadow_x, 0), max(-shadow_y, 0)),
+            )
 
     image.alpha_composite(text_image, (x,y))
     return image
 
+def generate_text_image_bytes(text: str, **kwargs) -> Tuple[bytes, int, int]:
+    """
+    Generate an image with generate_text_image and return its raw RGBA pixels.
+    Useful to pass the image to other libraries without encoding it as a png.
+
+    :param str text: The text to render.
+    :param **kwargs: All other keyword arguments are passed directly to generate_text_image.
+
+    :return: A tuple containing the RGBA pixels (row by row, 4 bytes per pixel), the width and the height of the image.
+    :rtype: (bytes, int, int)
+    """
+    image = generate_text_image(text, **kwargs)
+    return (image.tobytes(), image.width, image.height)
+
 def generate_and_save_text_image(
     text: str, *,
     out_directory: Optional[str]=None,
@@ -422,6 +573,41 @@ def generate_and_save_text_image(
     image.save(fullpath, format="png")
     return image
 
+# Keyword arguments for generate_text_image shared by all texts generated by a worker process
+_worker_generate_kwargs: dict = {}
+
+def _init_generate_worker(generate_kwargs: dict) -> None:
+    global _worker_generate_kwargs
+    _worker_generate_kwargs = generate_kwargs
+
+def _generate_and_save_in_worker(text: str, out_directory: Optional[str]) -> None:
+    generate_and_save_text_image(text, out_directory=out_directory, **_worker_generate_kwargs)
+
+def generate_and_save_text_images(
+    texts: Iterable[str], *,
+    out_directory: Optional[str]=None,
+    workers: Optional[int]=None,
+    **kwargs
+) -> None:
+    """
+    Generate an image for each text with generate_and_save_text_image using multiple processes.
+    File names are extracted from the texts.
+
+    :param texts: The texts to render.
+    :type texts: Iterable[str]
+    :param out_directory: The output directory. If None the cwd is used.
+    :type out_directory: str or None
+    :param workers: The maximum number of processes to use. If None the number of CPUs is used.
+    :type workers: int or None
+    :param **kwargs: All other keyword arguments are passed directly to generate_text_image.
+                     They're sent to each process only once, so they must be picklable.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_generate_worker, initargs=(kwargs,)) as executor:
+        futures = [executor.submit(_generate_and_save_in_worker, text, out_directory) for text in texts]
+        for future in futures:
+            future.result()
+
 if __name__ == "__main__":
     from t2i import __main__
     from sys import argv, exit